@@ -1,32 +1,119 @@
 """AI agent for playing Gomoku using Ollama."""
 
-import requests
+import httpx
 import json
 import re
 
+try:
+    import orjson
+
+    # orjson parses the small stream chunks several times faster than
+    # the stdlib and takes bytes directly, skipping the str decode
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+from gomoku_board import (
+    EMPTY,
+    SYMBOL_TO_CODE,
+    CODE_TO_SYMBOL,
+    SYMMETRY_TRANSFORMS,
+    tactical_scan,
+)
+
+# One scanner for every "row,col"-like pair the model may emit
+# ("5,3", "5, 3", "(5, 3)", "5 3"); scanning all pairs once and keeping
+# the first that lands on an empty cell replaces four separate regex
+# passes over the full response
+_MOVE_RE = re.compile(r"(\d+)\s*[,\s]\s*(\d+)")
+
+# Rules/format template shared by every agent, formatted once per
+# instance with its symbols; the string literal itself is built at
+# import, never inside the per-move prompt path
+_PROMPT_TEMPLATE = """You are an expert Gomoku player. You play as '{player}' and your opponent plays as '{opponent}'.
+
+GAME RULES:
+- Win condition: get 5 of your stones in a row (horizontal, vertical, or diagonal)
+- The board is one '/'-separated field per row, top row first: '{player}' = your stones, '{opponent}' = opponent's stones, a digit = that many empty cells in a row
+- Rows and columns are numbered from 0
+
+CRITICAL: you can ONLY place your stone on an EMPTY cell.
+
+IMPORTANT: Respond with ONLY row,col of an empty position.
+Format: row,col (e.g., "5,3" or "0,0")
+
+NOTE: If you have a thinking process, try to make it as concise as possible.
+"""
+
+
+def create_ollama_client():
+    """Create the async HTTP client both players share.
+
+    One client means one keep-alive pool for the whole game: the two
+    agents' alternating requests reuse a single warm TCP connection to
+    the local server instead of each keeping its own socket. Ollama
+    serves cleartext HTTP/1.1 (no ALPN), so HTTP/2 stream multiplexing
+    is not available; overlapping requests simply borrow a second
+    pooled connection, which the limits below allow for.
+
+    Returns:
+        Configured httpx.AsyncClient instance
+    """
+    return httpx.AsyncClient(
+        base_url="http://localhost:11434",
+        limits=httpx.Limits(max_keepalive_connections=4,
+                            keepalive_expiry=60),
+        headers={"Accept-Encoding": "gzip, deflate"},
+        timeout=60,
+    )
+
 
 class GomokuAI:
     """AI agent that uses Ollama's model to play Gomoku."""
-    
-    def __init__(self, name, player_symbol, model="gpt-oss:20b"):
+
+    def __init__(self, name, player_symbol, model="gpt-oss:20b", client=None):
         """Initialize the AI agent.
-        
+
         Args:
             name: Name of the AI agent
             player_symbol: Symbol for this player ('X' or 'O')
             model: Ollama model to use (default: gpt-oss:20b)
+            client: Optional shared httpx.AsyncClient; a pooled client
+                is created if not provided
         """
         self.name = name
         self.player_symbol = player_symbol
         self.model = model
-        self.ollama_url = "http://localhost:11434/api/generate"
-        
-    def get_move(self, board):
+        self.ollama_url = "/api/generate"  # relative to the client's base_url
+        self.client = client if client is not None else create_ollama_client()
+        # LLM move cache keyed by (Zobrist hash, player symbol); filled
+        # under all 8 board symmetries so rotated/mirrored repeats of a
+        # position (common in early game) skip the model entirely
+        self._move_cache = {}
+        # Server-side KV state from the last completed generation, plus
+        # how many moves had been played when it was captured. Passing
+        # the context back lets Ollama skip prefill for everything the
+        # model has already seen, so follow-up prompts only need to
+        # describe the moves played since
+        self._last_context = None
+        self._last_history_len = 0
+        # Last formatted board, keyed by its Zobrist hash (None until
+        # the first format, since the empty board hashes to 0)
+        self._fmt_cache_hash = None
+        self._fmt_cache_str = ""
+        # Static part of every prompt, formatted once from the module
+        # template: prompt length drives prefill time, so the rules are
+        # kept short and never rebuilt on the per-move path
+        opponent = 'O' if player_symbol == 'X' else 'X'
+        self._static_prompt_prefix = _PROMPT_TEMPLATE.format(
+            player=player_symbol, opponent=opponent)
+        
+    async def get_move(self, board):
         """Get the next move from the AI.
-        
+
         Args:
             board: GomokuBoard instance
-            
+
         Returns:
             Tuple (row, col) for the next move, or None if no valid move
         """
@@ -35,58 +122,105 @@ class GomokuAI:
         
         if not empty_positions:
             return None
-        
-        # First, check for immediate winning move
-        winning_move = self._find_winning_move(board, self.player_symbol, empty_positions)
-        if winning_move:
+        # Set twin of the list for the O(1) membership tests downstream
+        empty_set = set(empty_positions)
+
+        # Reuse a previously computed move for this position (or a
+        # symmetry variant of it) before doing any other work
+        cached_move = self._move_cache.get((board.zobrist, self.player_symbol))
+        if cached_move is not None and cached_move in empty_set:
+            print(f"[CACHE] Reusing cached move {cached_move}")
+            return cached_move
+
+        # Check for forced moves — a win, a block, or an open-four
+        # structure either side — all probed in a single pass over the
+        # empty cells. Any hit skips the LLM call entirely
+        my_bb = board.bb_x if self.player_symbol == 'X' else board.bb_o
+        opp_bb = board.bb_o if self.player_symbol == 'X' else board.bb_x
+        my_win, opp_win, my_open_four, opp_open_four = tactical_scan(
+            my_bb, opp_bb, board.size)
+        if my_win[0] >= 0:
             print(f"[STRATEGY] Found winning move!")
-            return winning_move
-        
-        # Second, check if we need to block opponent's winning move
-        opponent = 'O' if self.player_symbol == 'X' else 'X'
-        blocking_move = self._find_winning_move(board, opponent, empty_positions)
-        if blocking_move:
+            return my_win
+        if opp_win[0] >= 0:
             print(f"[STRATEGY] Blocking opponent's winning move!")
-            return blocking_move
-        
-        # If no immediate tactical move, use LLM for strategic decision
-        # Create a simple board representation for the AI
-        board_str = self._format_board_for_ai(board)
-        
-        # Create prompt for the AI
-        prompt = self._create_prompt(board, board_str)
+            return opp_win
+        if my_open_four[0] >= 0:
+            print(f"[STRATEGY] Building an open four!")
+            return my_open_four
+        if opp_open_four[0] >= 0:
+            print(f"[STRATEGY] Denying opponent's open four!")
+            return opp_open_four
+        
+        # If no immediate tactical move, use LLM for strategic decision.
+        # When the server still holds our KV state, only the moves
+        # played since then need to be sent; otherwise build the full
+        # board prompt
+        if self._last_context is not None:
+            prompt = self._create_incremental_prompt(board)
+        else:
+            board_str = self._format_board_for_ai(board)
+            prompt = self._create_prompt(board, board_str)
         
         # Debug: Print prompt length
         print(f"[DEBUG] Prompt length: {len(prompt)} characters")
         
         # Get response from Ollama
-        move = self._query_ollama(prompt, board, empty_positions)
-        
+        move = await self._query_ollama(prompt, board, empty_positions, empty_set)
+
+        if move is not None:
+            self._cache_move(board, move)
+
         return move
+
+    def _cache_move(self, board, move):
+        """Cache a computed move under all 8 symmetries of the position.
+
+        Args:
+            board: GomokuBoard instance the move was computed for
+            move: Tuple (row, col) to cache
+        """
+        row, col = move
+        for transform, h in zip(SYMMETRY_TRANSFORMS, board.symmetric_hashes()):
+            key = (h, self.player_symbol)
+            self._move_cache[key] = transform(row, col, board.size)
     
     def _format_board_for_ai(self, board):
-        """Format the board in a readable way for the AI.
-        
+        """Encode the board as one compact FEN-style line for the AI.
+
+        Each row becomes a field of player symbols and run-length digits
+        for empty cells (e.g. "2XO2" = 2 empty, X, O, 2 empty), fields
+        joined by '/'. Roughly 10x fewer prompt characters than the
+        padded grid this replaces, which cuts prefill time accordingly.
+
         Args:
             board: GomokuBoard instance
-            
+
         Returns:
             String representation of the board
         """
-        result = "Current board state:\n"
-        result += "   "
-        for i in range(board.size):
-            result += f"{i:2} "
-        result += "\n"
-        
-        for i in range(board.size):
-            result += f"{i:2} "
-            for j in range(board.size):
-                cell = board.board[i][j]
-                result += f" {cell} "
-            result += "\n"
-        
-        return result
+        if board.zobrist == self._fmt_cache_hash:
+            return self._fmt_cache_str
+
+        fields = []
+        for row in board.board.tolist():
+            field = ""
+            run = 0
+            for cell in row:
+                if cell == EMPTY:
+                    run += 1
+                else:
+                    if run:
+                        field += str(run)
+                        run = 0
+                    field += CODE_TO_SYMBOL[cell]
+            if run:
+                field += str(run)
+            fields.append(field)
+
+        self._fmt_cache_hash = board.zobrist
+        self._fmt_cache_str = "/".join(fields)
+        return self._fmt_cache_str
     
     def _create_prompt(self, board, board_str):
         """Create a prompt for the AI model.
@@ -98,146 +232,211 @@ class GomokuAI:
         Returns:
             Prompt string
         """
-        opponent = 'O' if self.player_symbol == 'X' else 'X'
-        
-        # Get empty positions for the prompt
-        empty_positions = board.get_empty_positions()
-        
         # Get recent moves for context
         recent_moves = ""
-        if board.move_history:
+        if board.move_count:
             recent_moves = "\nRecent moves:\n"
-            for i, (r, c, p) in enumerate(board.move_history[-5:]):
-                recent_moves += f"Move {len(board.move_history) - 5 + i + 1}: Player {p} at ({r},{c})\n"
-        
-        # Show some example valid moves
-        example_moves = ""
-        if len(empty_positions) > 0:
-            examples = empty_positions[:min(10, len(empty_positions))]
-            example_moves = "\nSome available positions: " + ", ".join([f"({r},{c})" for r, c in examples])
-        
-        prompt = f"""You are an expert Gomoku player. You play as '{self.player_symbol}' and your opponent plays as '{opponent}'.
-
-{board_str}{recent_moves}{example_moves}
+            for i in range(max(0, board.move_count - 5), board.move_count):
+                symbol = CODE_TO_SYMBOL[int(board.history_players[i])]
+                recent_moves += (f"Move {i + 1}: Player {symbol} at "
+                                 f"({board.history_rows[i]},{board.history_cols[i]})\n")
 
-GAME RULES:
-- Board size: {board.size}x{board.size}
-- Win condition: Get 5 of your stones in a row (horizontal, vertical, or diagonal)
-- '{self.player_symbol}' = your stones, '{opponent}' = opponent's stones, ' ' (space) = empty cells
+        prompt = f"""{self._static_prompt_prefix}
+Board {board.size}x{board.size}: {board_str}
+{recent_moves}
+Choose an empty position:"""
 
-CRITICAL: You can ONLY place your stone on EMPTY cells (marked with space ' ').
-DO NOT choose positions that already have '{self.player_symbol}' or '{opponent}'.
+        return prompt
 
-STRATEGY:
-1. Try to create or extend your own lines of stones
-2. Block opponent's lines if they're getting close to 5
-3. Choose empty positions near existing stones for better chances
+    def _create_incremental_prompt(self, board):
+        """Create a short continuation prompt for a held KV context.
 
-IMPORTANT: Respond with ONLY row,col of an EMPTY position.
-Format: row,col (e.g., "5,3" or "0,0")
+        Describes every move played since the context was captured —
+        including this agent's own, in case the move actually played
+        differed from what the model answered — so cumulative prefill
+        stays proportional to the game length instead of its square.
 
-NOTE: If you have a thinking process, try to make it as concise as possible.
+        Args:
+            board: GomokuBoard instance
 
-Choose an empty position:"""
-        
-        return prompt
+        Returns:
+            Prompt string
+        """
+        my_code = SYMBOL_TO_CODE[self.player_symbol]
+        lines = []
+        for i in range(self._last_history_len, board.move_count):
+            who = "You" if board.history_players[i] == my_code else "Opponent"
+            lines.append(f"{who} played at "
+                         f"({board.history_rows[i]},{board.history_cols[i]}).")
+        lines.append("Choose an empty position:")
+        return " ".join(lines)
     
-    def _query_ollama(self, prompt, board, empty_positions):
+    async def _query_ollama(self, prompt, board, empty_positions, empty_set):
         """Query the Ollama API for a move.
-        
+
         Args:
             prompt: The prompt to send to the AI
             board: GomokuBoard instance
             empty_positions: List of valid empty positions
-            
+            empty_set: The same positions as a set for O(1) lookups
+
         Returns:
             Tuple (row, col) for the move
         """
         try:
             # Query Ollama with streaming enabled
             print(f"[DEBUG] Sending request to Ollama with model: {self.model}")
-            response = requests.post(
+            # Size the KV allocation to this request instead of the
+            # model's default window: a smaller num_ctx shrinks the KV
+            # cache and speeds decode on memory-bound hardware, and the
+            # answer is only "row,col" so generation is capped hard.
+            # Any held context tokens must stay inside the window too
+            prompt_tokens = len(prompt) // 4  # rough 4-chars-per-token
+            context_tokens = len(self._last_context) if self._last_context else 0
+            payload = {
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,  # Enable streaming
+                "options": {
+                    "num_ctx": min(1024, prompt_tokens + 64) + context_tokens,
+                    "num_predict": 16,
+                    "stop": ["\n\n"],
+                    #"temperature": 0.3,
+                    #"top_k": 10,
+                    #"top_p": 0.9,
+                }
+            }
+            if self._last_context is not None:
+                # Continue from the server-held KV state of our last
+                # completed generation instead of prefilling from scratch
+                payload["context"] = self._last_context
+            async with self.client.stream(
+                "POST",
                 self.ollama_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": True,  # Enable streaming
-                    "options": {
-                        #"temperature": 0.3,
-                        #"top_k": 10,
-                        #"top_p": 0.9,
-                    }
-                },
+                json=payload,
                 timeout=60,
-                stream=True  # Enable streaming in requests
-            )
-            
-            print(f"[DEBUG] Received streaming response with status: {response.status_code}")
-            
-            if response.status_code == 200:
+            ) as response:
+                print(f"[DEBUG] Received streaming response with status: {response.status_code}")
+
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode(errors="replace")
+                    print(f"[ERROR] Ollama API error: {response.status_code}")
+                    print(f"[ERROR] Response: {error_text}")
+                    return self._get_strategic_fallback(board, empty_positions)
+
                 # Collect the streamed response
                 thinking_parts = []
                 response_parts = []
                 last_result = {}
-                
+
                 print("[AI THINKING] ", end="", flush=True)
-                
-                # Process the stream
-                for line in response.iter_lines():
-                    if line:
+
+                # Process the stream: buffer raw bytes, slice complete
+                # lines on \n, and parse each line with orjson — one
+                # buffer instead of per-line iterator machinery
+                buffer = bytearray()
+                async for data in response.aiter_bytes():
+                    buffer += data
+                    while True:
+                        newline = buffer.find(b"\n")
+                        if newline < 0:
+                            break
+                        line = bytes(buffer[:newline])
+                        del buffer[:newline + 1]
+                        if not line:
+                            continue
                         try:
-                            chunk = json.loads(line)
-                            last_result = chunk
-                            
-                            # Stream thinking field
-                            if "thinking" in chunk and chunk["thinking"]:
-                                thinking_parts.append(chunk["thinking"])
-                                print(chunk["thinking"], end="", flush=True)
-                            
-                            # Collect response field
-                            if "response" in chunk and chunk["response"]:
-                                response_parts.append(chunk["response"])
-                                
-                        except json.JSONDecodeError:
+                            chunk = _loads(line)
+                        except ValueError:
                             continue
-                
+                        last_result = chunk
+
+                        # Stream thinking field
+                        if "thinking" in chunk and chunk["thinking"]:
+                            thinking_parts.append(chunk["thinking"])
+                            print(chunk["thinking"], end="", flush=True)
+
+                        # Collect response field
+                        if "response" in chunk and chunk["response"]:
+                            response_parts.append(chunk["response"])
+
+                            # Abort the stream the instant a valid move
+                            # is visible; any further tokens only cost
+                            # latency. A pair flush against the end of
+                            # the text is skipped — its last number may
+                            # still be streaming in
+                            text = "".join(response_parts)
+                            tail = text[-40:]
+                            if len(text) > 40:
+                                # The window may have cut a number in
+                                # half; drop the clipped leading digits
+                                # so a partial pair can't parse as a
+                                # different (possibly valid) move
+                                tail = tail.lstrip("0123456789")
+                            for match in _MOVE_RE.finditer(tail):
+                                if match.end() == len(tail):
+                                    continue
+                                early_move = (int(match.group(1)),
+                                              int(match.group(2)))
+                                if early_move in empty_set:
+                                    print()  # New line after thinking
+                                    print(f"[DEBUG] Early move {early_move} parsed, aborting stream")
+                                    await response.aclose()
+                                    return early_move
+
+                # Flush a final line the server did not newline-terminate
+                # (the done chunk matters: it carries the KV context)
+                if buffer:
+                    try:
+                        chunk = _loads(bytes(buffer))
+                    except ValueError:
+                        chunk = None
+                    if chunk is not None:
+                        last_result = chunk
+                        if "thinking" in chunk and chunk["thinking"]:
+                            thinking_parts.append(chunk["thinking"])
+                            print(chunk["thinking"], end="", flush=True)
+                        if "response" in chunk and chunk["response"]:
+                            response_parts.append(chunk["response"])
+
                 print()  # New line after thinking
-                
+
+                # Persist the KV context for the next turn. Only a
+                # completed stream carries one — an aborted stream keeps
+                # the previous sync point, and the incremental prompt
+                # then simply covers more moves
+                context = last_result.get("context")
+                if context:
+                    self._last_context = context
+                    self._last_history_len = board.move_count
+
                 # Combine all parts
                 full_thinking = "".join(thinking_parts)
                 ai_response = "".join(response_parts).strip()
-                
+
                 # Debug: Print the full AI response and metadata
                 print(f"[DEBUG] AI raw response: '{ai_response}'")
                 print(f"[DEBUG] Response metadata: done={last_result.get('done')}, done_reason={last_result.get('done_reason')}")
-                
+
                 # Check if response is empty and log additional info
                 if not ai_response:
                     print(f"[DEBUG] Empty response after streaming")
-                
+
                 # Parse the response
-                move = self._parse_move(ai_response, empty_positions)
-                
+                move = self._parse_move(ai_response, empty_set)
+
                 if move:
                     return move
                 else:
                     print(f"{self.name} generated invalid move: {ai_response}, choosing strategic fallback")
                     return self._get_strategic_fallback(board, empty_positions)
-            else:
-                print(f"[ERROR] Ollama API error: {response.status_code}")
-                print(f"[ERROR] Response: {response.text}")
-                return self._get_strategic_fallback(board, empty_positions)
-                
-        except requests.exceptions.Timeout as e:
+
+        except httpx.TimeoutException as e:
             print(f"[ERROR] Timeout when querying Ollama: {e}")
             return self._get_strategic_fallback(board, empty_positions)
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             print(f"[ERROR] Request exception when querying Ollama: {e}")
             return self._get_strategic_fallback(board, empty_positions)
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON decode error: {e}")
-            print(f"[ERROR] Raw response text: {response.text if 'response' in locals() else 'N/A'}")
-            return self._get_strategic_fallback(board, empty_positions)
         except Exception as e:
             print(f"[ERROR] Unexpected exception when querying Ollama: {type(e).__name__}: {e}")
             import traceback
@@ -245,13 +444,13 @@ Choose an empty position:"""
             # Fallback to strategic position
             return self._get_strategic_fallback(board, empty_positions)
     
-    def _parse_move(self, response, empty_positions):
+    def _parse_move(self, response, empty_set):
         """Parse the AI's response to extract the move.
-        
+
         Args:
             response: The AI's response string
-            empty_positions: List of valid empty positions
-            
+            empty_set: Set of valid empty positions
+
         Returns:
             Tuple (row, col) if valid, None otherwise
         """
@@ -260,62 +459,18 @@ Choose an empty position:"""
             return None
             
         print(f"[DEBUG] Parsing response: '{response[:200]}'")  # Show first 200 chars
-        
-        # Try to find numbers in the format "row,col" or "row, col"
-        patterns = [
-            r'(\d+)\s*,\s*(\d+)',  # Match "row,col" or "row, col"
-            r'row\s*[:=]?\s*(\d+).*col(?:umn)?\s*[:=]?\s*(\d+)',  # Match "row: 5, column: 3"
-            r'\((\d+)\s*,\s*(\d+)\)',  # Match "(row, col)"
-            r'(\d+)\s+(\d+)',  # Match "row col" with space
-        ]
-        
-        for i, pattern in enumerate(patterns):
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                try:
-                    row = int(match.group(1))
-                    col = int(match.group(2))
-                    
-                    print(f"[DEBUG] Pattern {i} matched: ({row}, {col})")
-                    
-                    # Verify the move is valid
-                    if (row, col) in empty_positions:
-                        print(f"[DEBUG] Valid move found: ({row}, {col})")
-                        return (row, col)
-                    else:
-                        print(f"[DEBUG] Move ({row}, {col}) not in empty positions")
-                except (ValueError, IndexError) as e:
-                    print(f"[DEBUG] Error parsing match: {e}")
-                    continue
-        
-        print(f"[DEBUG] No valid move found in response")
-        return None
-    
-    def _find_winning_move(self, board, player, empty_positions):
-        """Find a winning move for the specified player.
-        
-        Args:
-            board: GomokuBoard instance
-            player: Player symbol to check for winning moves
-            empty_positions: List of empty positions
-            
-        Returns:
-            Tuple (row, col) if a winning move exists, None otherwise
-        """
-        # Try each empty position
-        for row, col in empty_positions:
-            # Temporarily place the stone
-            board.board[row][col] = player
-            
-            # Check if this creates a win
-            if board.check_winner(row, col, player):
-                # Remove the temporary stone
-                board.board[row][col] = ' '
+
+        # Scan every number pair once, keeping the first valid move
+        for match in _MOVE_RE.finditer(response):
+            row = int(match.group(1))
+            col = int(match.group(2))
+
+            if (row, col) in empty_set:
+                print(f"[DEBUG] Valid move found: ({row}, {col})")
                 return (row, col)
-            
-            # Remove the temporary stone
-            board.board[row][col] = ' '
-        
+            print(f"[DEBUG] Move ({row}, {col}) not in empty positions")
+
+        print(f"[DEBUG] No valid move found in response")
         return None
     
     def _get_strategic_fallback(self, board, empty_positions):
@@ -338,6 +493,7 @@ Choose an empty position:"""
         
         # Strategy 2: Find positions adjacent to existing stones (more strategic)
         adjacent_positions = []
+        adjacent_set = set()
         for row, col in empty_positions:
             # Check if this position is adjacent to any existing stone
             for dr in [-1, 0, 1]:
@@ -346,10 +502,11 @@ Choose an empty position:"""
                         continue
                     nr, nc = row + dr, col + dc
                     if 0 <= nr < board.size and 0 <= nc < board.size:
-                        if board.board[nr][nc] != ' ':
+                        if board.board[nr][nc] != EMPTY:
                             adjacent_positions.append((row, col))
+                            adjacent_set.add((row, col))
                             break
-                if (row, col) in adjacent_positions:
+                if (row, col) in adjacent_set:
                     break
         
         # If we found adjacent positions, pick one (preferably near center)
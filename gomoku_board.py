@@ -1,19 +1,273 @@
 """Gomoku game board implementation."""
 
+import random
+
+import numpy as np
+
+
+# Cell codes for the uint8 board grid
+EMPTY = 0
+SYMBOL_TO_CODE = {'X': 1, 'O': 2}
+CODE_TO_SYMBOL = {EMPTY: ' ', 1: 'X', 2: 'O'}
+
+# Index into the Zobrist table for each player symbol
+PLAYER_INDEX = {'X': 0, 'O': 1}
+
+# The 8 symmetries of a square board, as (row, col, size) -> (row, col).
+# Order: identity, rotations by 90/180/270, horizontal mirror, vertical
+# mirror, transpose, anti-transpose.
+SYMMETRY_TRANSFORMS = (
+    lambda r, c, n: (r, c),
+    lambda r, c, n: (c, n - 1 - r),
+    lambda r, c, n: (n - 1 - r, n - 1 - c),
+    lambda r, c, n: (n - 1 - c, r),
+    lambda r, c, n: (r, n - 1 - c),
+    lambda r, c, n: (n - 1 - r, c),
+    lambda r, c, n: (c, r),
+    lambda r, c, n: (n - 1 - c, n - 1 - r),
+)
+
+# Line directions: horizontal, vertical, diagonal \, diagonal /
+_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Per-size SWAR data: (shift, win mask, open-four mask) per direction.
+# Bit row*size+col holds cell (row, col); the win masks keep a 5-window
+# from wrapping across a board edge, the open-four masks do the same
+# for the 6-cell window empty-4 stones-empty.
+_swar_data = {}
+
+
+def _swar_shifts_masks(size):
+    """Get SWAR shift distances and wraparound masks for a board size.
+
+    Args:
+        size: Board size
+
+    Returns:
+        Tuple of 4 (shift, win_mask, open_four_mask) triples, one per
+        line direction
+    """
+    data = _swar_data.get(size)
+    if data is None:
+        def start_mask(valid):
+            mask = 0
+            for r in range(size):
+                for c in range(size):
+                    if valid(r, c):
+                        mask |= 1 << (r * size + c)
+            return mask
+
+        data = (
+            # Horizontal: start column leaves room for 5 to the right
+            # (win) or an empty cell each side of 4 stones (open four)
+            (1,
+             start_mask(lambda r, c: c <= size - 5),
+             start_mask(lambda r, c: 1 <= c <= size - 5)),
+            # Vertical: start row leaves room for 5 below
+            (size,
+             start_mask(lambda r, c: r <= size - 5),
+             start_mask(lambda r, c: 1 <= r <= size - 5)),
+            # Diagonal \
+            (size + 1,
+             start_mask(lambda r, c: r <= size - 5 and c <= size - 5),
+             start_mask(lambda r, c: 1 <= r <= size - 5 and 1 <= c <= size - 5)),
+            # Diagonal /
+            (size - 1,
+             start_mask(lambda r, c: r <= size - 5 and c >= 4),
+             start_mask(lambda r, c: 1 <= r <= size - 5 and 4 <= c <= size - 2)),
+        )
+        _swar_data[size] = data
+    return data
+
+
+# Specialized (win, open_four) tester pairs generated per board size
+_board_ops = {}
+
+
+def make_board_ops(size):
+    """Build SWAR testers specialized for a fixed board size.
+
+    The board size is effectively a compile-time constant, so the four
+    shift chains are emitted as source with the shift distances and edge
+    masks baked in as integer literals and exec'd once per size —
+    partial evaluation that removes the direction loop, the shift
+    arithmetic, and the mask-table lookup from every probe.
+
+    Args:
+        size: Board size
+
+    Returns:
+        Tuple (win, open_four) of functions win(bb) and
+        open_four(bb, empty_bb) over packed bitboards
+    """
+    ops = _board_ops.get(size)
+    if ops is None:
+        win_checks = []
+        open_checks = []
+        for shift, win_mask, open_mask in _swar_shifts_masks(size):
+            win_checks.append(
+                f"bb & (bb >> {shift}) & (bb >> {2 * shift})"
+                f" & (bb >> {3 * shift}) & (bb >> {4 * shift})"
+                f" & {win_mask}")
+            # A surviving bit i needs empties at i-shift and i+4*shift
+            open_checks.append(
+                f"bb & (bb >> {shift}) & (bb >> {2 * shift})"
+                f" & (bb >> {3 * shift}) & (empty << {shift})"
+                f" & (empty >> {4 * shift}) & {open_mask}")
+        source = (
+            "def win(bb):\n"
+            "    return bool((" + ")\n        or (".join(win_checks) + "))\n"
+            "def open_four(bb, empty):\n"
+            "    return bool((" + ")\n        or (".join(open_checks) + "))\n"
+        )
+        namespace = {}
+        exec(source, namespace)
+        ops = (namespace["win"], namespace["open_four"])
+        _board_ops[size] = ops
+    return ops
+
+
+def swar_win(bitboard, size):
+    """Test a player bitboard for 5 in a row with SWAR shift chains.
+
+    Each direction is ~5 integer shift-and-AND ops over the packed
+    position: a surviving bit marks the start of a 5-stone run.
+
+    Args:
+        bitboard: Packed player bitboard (bit row*size+col per cell)
+        size: Board size
+
+    Returns:
+        True if the bitboard contains 5 in a row
+    """
+    return make_board_ops(size)[0](bitboard)
+
+
+def swar_open_four(bitboard, empty_bb, size):
+    """Test a player bitboard for four in a row with both ends empty.
+
+    An open four cannot be stopped: either extension completes five, so
+    for the player to move it is a forced win next turn, and for the
+    opponent a position that must never be allowed to arise.
+
+    Args:
+        bitboard: Packed player bitboard
+        empty_bb: Bitboard of the empty cells
+        size: Board size
+
+    Returns:
+        True if the bitboard contains an open four
+    """
+    return make_board_ops(size)[1](bitboard, empty_bb)
+
+
+def tactical_scan(my_bb, opp_bb, size):
+    """Probe every empty cell for forced structures, in one pass.
+
+    Each empty bit is probed with the SWAR tests for both bitboards, so
+    the win check, the block check, and the open-four threats share one
+    walk of the empty cells. Probing is pure integer ops — no board
+    mutation, no per-cell direction walks. (The loop stays plain Python:
+    the bitboards are arbitrary-precision ints, which a JIT cannot
+    narrow to machine words anyway.)
+
+    Args:
+        my_bb: Bitboard of the player to move
+        opp_bb: Bitboard of the opponent
+        size: Board size
+
+    Returns:
+        Tuple (my_win, opp_win, my_open_four, opp_open_four) of
+        (row, col) pairs, each (-1, -1) when absent: the mover's
+        immediate winning cell, the opponent's winning cell to block,
+        a cell giving the mover an open four (a forced win next turn),
+        and a cell where the opponent would build an open four (to deny
+        now). Cells are the first in row-major order; the scan
+        short-circuits once my_win is found
+    """
+    win, open_four = make_board_ops(size)
+    opp_win = my_open_four = opp_open_four = (-1, -1)
+    all_empty = ~(my_bb | opp_bb) & ((1 << (size * size)) - 1)
+    probe = all_empty
+    while probe:
+        bit = probe & -probe  # lowest remaining cell, row-major order
+        probe ^= bit
+        index = bit.bit_length() - 1
+        cell = (index // size, index % size)
+        if win(my_bb | bit):
+            return cell, opp_win, my_open_four, opp_open_four
+        if opp_win[0] < 0 and win(opp_bb | bit):
+            opp_win = cell
+        remaining = all_empty ^ bit
+        if (my_open_four[0] < 0
+                and open_four(my_bb | bit, remaining)):
+            my_open_four = cell
+        if (opp_open_four[0] < 0
+                and open_four(opp_bb | bit, remaining)):
+            opp_open_four = cell
+    return (-1, -1), opp_win, my_open_four, opp_open_four
+
+
+# One Zobrist table per board size, generated lazily. Seeded so hashes
+# are stable across runs, which keeps debug output comparable.
+_zobrist_tables = {}
+
+
+def _zobrist_table(size):
+    """Get the Zobrist random table for a board size.
+
+    Args:
+        size: Board size
+
+    Returns:
+        Nested list table[row][col][player_index] of 64-bit ints
+    """
+    table = _zobrist_tables.get(size)
+    if table is None:
+        rng = random.Random(0x60D0C0)
+        table = [[[rng.getrandbits(64) for _ in range(2)]
+                  for _ in range(size)]
+                 for _ in range(size)]
+        _zobrist_tables[size] = table
+    return table
+
 
 class GomokuBoard:
     """Represents a Gomoku game board."""
-    
+
     def __init__(self, size=10):
         """Initialize the board.
-        
+
         Args:
             size: Board size (default 10x10)
         """
         self.size = size
-        self.board = [[' ' for _ in range(size)] for _ in range(size)]
-        self.move_history = []
-        
+        # Flat uint8 grid (0=empty, 1='X', 2='O'): scans over it run as
+        # single NumPy C loops instead of size^2 Python comparisons
+        self.board = np.zeros((size, size), dtype=np.uint8)
+        # Move history in struct-of-arrays form: three preallocated
+        # uint8 columns plus a cursor, instead of a growing list of
+        # per-move tuples. Slicing recent moves is allocation-free and
+        # each move costs 3 bytes rather than a tuple object
+        self.history_rows = np.empty(size * size, dtype=np.uint8)
+        self.history_cols = np.empty(size * size, dtype=np.uint8)
+        self.history_players = np.empty(size * size, dtype=np.uint8)
+        self.move_count = 0
+        # Incremental run tables: for an occupied cell, _run_fwd[d,r,c]
+        # is the length of the same-color run starting at (r,c) and
+        # going along _DIRECTIONS[d] (inclusive), _run_bwd the same
+        # going against it. Updated in make_move for only the cells on
+        # the 4 lines through the new stone, they make check_winner a
+        # constant-time table lookup instead of a fresh 4-direction walk
+        self._run_fwd = np.zeros((4, size, size), dtype=np.uint8)
+        self._run_bwd = np.zeros((4, size, size), dtype=np.uint8)
+        # Per-player bitboards mirroring the grid (bit row*size+col),
+        # kept in sync by make_move for the SWAR win probes
+        self.bb_x = 0
+        self.bb_o = 0
+        self.zobrist = 0
+        self._zobrist_table = _zobrist_table(size)
+
     def display(self):
         """Display the board in the terminal."""
         print("\n   ", end="")
@@ -24,7 +278,7 @@ class GomokuBoard:
         for i in range(self.size):
             print(f"{i:2}|", end="")
             for j in range(self.size):
-                print(f" {self.board[i][j]} ", end="")
+                print(f" {CODE_TO_SYMBOL[int(self.board[i][j])]} ", end="")
             print("|")
         print("   " + "---" * self.size)
     
@@ -40,7 +294,7 @@ class GomokuBoard:
         """
         if row < 0 or row >= self.size or col < 0 or col >= self.size:
             return False
-        return self.board[row][col] == ' '
+        return self.board[row][col] == EMPTY
     
     def make_move(self, row, col, player):
         """Place a stone on the board.
@@ -56,9 +310,76 @@ class GomokuBoard:
         if not self.is_valid_move(row, col):
             return False
         
-        self.board[row][col] = player
-        self.move_history.append((row, col, player))
+        self.board[row][col] = SYMBOL_TO_CODE[player]
+        bit = 1 << (row * self.size + col)
+        if player == 'X':
+            self.bb_x |= bit
+        else:
+            self.bb_o |= bit
+        self.history_rows[self.move_count] = row
+        self.history_cols[self.move_count] = col
+        self.history_players[self.move_count] = SYMBOL_TO_CODE[player]
+        self.move_count += 1
+        self.zobrist ^= self._zobrist_table[row][col][PLAYER_INDEX[player]]
+        self._update_runs(row, col, SYMBOL_TO_CODE[player])
         return True
+
+    def _update_runs(self, row, col, code):
+        """Extend the incremental run tables for a newly placed stone.
+
+        Only the runs on the 4 lines through (row, col) change, so the
+        update walks at most one run per direction instead of rescanning
+        the board.
+
+        Args:
+            row: Row index of the new stone
+            col: Column index of the new stone
+            code: Cell code of the stone's player
+        """
+        size = self.size
+        for d, (dr, dc) in enumerate(_DIRECTIONS):
+            # Length of the adjoining runs ahead of and behind the stone
+            ahead = 0
+            r, c = row + dr, col + dc
+            if 0 <= r < size and 0 <= c < size and self.board[r, c] == code:
+                ahead = int(self._run_fwd[d, r, c])
+            behind = 0
+            r, c = row - dr, col - dc
+            if 0 <= r < size and 0 <= c < size and self.board[r, c] == code:
+                behind = int(self._run_bwd[d, r, c])
+
+            self._run_fwd[d, row, col] = 1 + ahead
+            self._run_bwd[d, row, col] = 1 + behind
+
+            # The stones behind now see a run extended by the new stone
+            # plus everything ahead of it, and vice versa
+            for k in range(1, behind + 1):
+                self._run_fwd[d, row - k * dr, col - k * dc] += 1 + ahead
+            for k in range(1, ahead + 1):
+                self._run_bwd[d, row + k * dr, col + k * dc] += 1 + behind
+
+    def symmetric_hashes(self):
+        """Get Zobrist hashes for all 8 symmetry variants of the position.
+
+        The hash at index i corresponds to the board with every stone
+        mapped through SYMMETRY_TRANSFORMS[i] (index 0 is the position
+        itself).
+
+        Returns:
+            List of 8 Zobrist hashes
+        """
+        hashes = []
+        for transform in SYMMETRY_TRANSFORMS:
+            h = 0
+            for i in range(self.move_count):
+                row = int(self.history_rows[i])
+                col = int(self.history_cols[i])
+                # Cell codes are 1-based, the Zobrist player axis 0-based
+                player_idx = int(self.history_players[i]) - 1
+                tr, tc = transform(row, col, self.size)
+                h ^= self._zobrist_table[tr][tc][player_idx]
+            hashes.append(h)
+        return hashes
     
     def check_winner(self, row, col, player):
         """Check if the last move resulted in a win.
@@ -71,33 +392,12 @@ class GomokuBoard:
         Returns:
             True if the player won, False otherwise
         """
-        directions = [
-            (0, 1),   # Horizontal
-            (1, 0),   # Vertical
-            (1, 1),   # Diagonal \
-            (1, -1)   # Diagonal /
-        ]
-        
-        for dr, dc in directions:
-            count = 1  # Count the current stone
-            
-            # Check in positive direction
-            r, c = row + dr, col + dc
-            while 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == player:
-                count += 1
-                r += dr
-                c += dc
-            
-            # Check in negative direction
-            r, c = row - dr, col - dc
-            while 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == player:
-                count += 1
-                r -= dr
-                c -= dc
-            
-            if count >= 5:
+        if self.board[row, col] != SYMBOL_TO_CODE[player]:
+            return False
+        for d in range(4):
+            run = int(self._run_fwd[d, row, col]) + int(self._run_bwd[d, row, col]) - 1
+            if run >= 5:
                 return True
-        
         return False
     
     def is_full(self):
@@ -106,10 +406,7 @@ class GomokuBoard:
         Returns:
             True if the board is full, False otherwise
         """
-        for row in self.board:
-            if ' ' in row:
-                return False
-        return True
+        return not (self.board == EMPTY).any()
     
     def get_board_state(self):
         """Get the current board state as a string.
@@ -118,12 +415,12 @@ class GomokuBoard:
             String representation of the board
         """
         state = ""
-        for i, row in enumerate(self.board):
+        for i, row in enumerate(self.board.tolist()):
             for j, cell in enumerate(row):
-                if cell == ' ':
+                if cell == EMPTY:
                     state += f"({i},{j}):empty "
                 else:
-                    state += f"({i},{j}):{cell} "
+                    state += f"({i},{j}):{CODE_TO_SYMBOL[cell]} "
         return state.strip()
     
     def get_empty_positions(self):
@@ -132,9 +429,4 @@ class GomokuBoard:
         Returns:
             List of tuples (row, col) for empty positions
         """
-        empty = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if self.board[i][j] == ' ':
-                    empty.append((i, j))
-        return empty
+        return [(int(r), int(c)) for r, c in np.argwhere(self.board == EMPTY)]
@@ -1,11 +1,31 @@
 """Main game loop for Gomoku AI vs AI."""
 
-import time
+import asyncio
+import os
 from gomoku_board import GomokuBoard
-from ai_agent import GomokuAI
+from ai_agent import GomokuAI, create_ollama_client
 
 
-def main():
+def configure_ollama_parallelism():
+    """Configure Ollama server parallelism for the two concurrent agents.
+
+    By default `ollama serve` serializes concurrent requests, so the two
+    players queue behind each other. OLLAMA_NUM_PARALLEL=2 lets the
+    server batch both players' generations in one forward pass, and
+    OLLAMA_MAX_LOADED_MODELS=1 keeps the single shared model resident.
+
+    The variables only take effect in the `ollama serve` process, so
+    they help when the server is launched from this environment (or a
+    shell that sources it); an already-running server keeps its own
+    settings, hence the reminder below.
+    """
+    os.environ.setdefault("OLLAMA_NUM_PARALLEL", "2")
+    os.environ.setdefault("OLLAMA_MAX_LOADED_MODELS", "1")
+    print("Note: for best performance run the server with:")
+    print("  OLLAMA_NUM_PARALLEL=2 OLLAMA_MAX_LOADED_MODELS=1 ollama serve")
+
+
+async def game():
     """Run a game of Gomoku between two AI agents."""
     BOARD_SIZE = 6
     print("=" * 50)
@@ -15,13 +35,16 @@ def main():
     print(f"Board size: {BOARD_SIZE}x{BOARD_SIZE}")
     print("Win condition: 5 in a row")
     print("\n" + "=" * 50 + "\n")
-    
+
+    configure_ollama_parallelism()
+
     # Initialize the board
     board = GomokuBoard(size=BOARD_SIZE)
     
-    # Initialize AI players
-    player1 = GomokuAI("AI Player 1", "X", model="gpt-oss:20b")
-    player2 = GomokuAI("AI Player 2", "O", model="gpt-oss:20b")
+    # Initialize AI players sharing one keep-alive connection pool
+    client = create_ollama_client()
+    player1 = GomokuAI("AI Player 1", "X", model="gpt-oss:20b", client=client)
+    player2 = GomokuAI("AI Player 2", "O", model="gpt-oss:20b", client=client)
     
     # Game state
     current_player = player1
@@ -29,7 +52,7 @@ def main():
     max_moves = 100  # Prevent infinite games
     
     print("Starting game...\n")
-    time.sleep(1)
+    await asyncio.sleep(1)
     
     # Display initial empty board
     print("Initial board:")
@@ -46,7 +69,7 @@ def main():
         
         # Get move from current player
         print(f"{current_player.name} is thinking...")
-        move = current_player.get_move(board)
+        move = await current_player.get_move(board)
         
         if move is None:
             print("No valid moves available. Game is a draw!")
@@ -82,12 +105,17 @@ def main():
         current_player = player2 if current_player == player1 else player1
         
         # Small delay for readability
-        time.sleep(0.5)
+        await asyncio.sleep(0.5)
     
     print(f"\n{'=' * 50}")
     print(f"Game ended after {max_moves} moves (maximum reached).")
     print(f"{'=' * 50}")
 
 
+def main():
+    """Entry point: run the async game loop."""
+    asyncio.run(game())
+
+
 if __name__ == "__main__":
     main()